@@ -7,15 +7,71 @@ Description: Advanced system monitoring with email alerts and database checks
 
 import psutil
 import platform
+import heapq
 import datetime
+import functools
+import itertools
 import json
 import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 import argparse
 import sys
+import tempfile
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Health statuses ordered by severity, so the worst one is a max() away
+_STATUS_NAMES = ("HEALTHY", "WARNING", "CRITICAL")
+_SEVERITY = {name: level for level, name in enumerate(_STATUS_NAMES)}
+
+
+def _write_json_atomic(data, filename):
+    """Write data as indented JSON, replacing filename atomically"""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2).encode()
+
+    # Write to a uniquely named file beside the target and rename over it,
+    # so readers such as the dashboard never see a half-written report and
+    # overlapping runs (e.g. the loop and a healthcheck) can't collide
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=os.path.dirname(filename) or ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        # mkstemp creates the file owner-only; keep reports world-readable
+        os.chmod(tmp_filename, 0o644)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_filename)
+        except OSError:
+            pass
+        raise
+
+
+@functools.lru_cache(maxsize=1)
+def _get_platform_info():
+    """Read platform details once; they don't change while the process runs"""
+    return {
+        "hostname": platform.node(),
+        "platform": platform.system(),
+        "platform_version": platform.version(),
+        "architecture": platform.machine(),
+        "processor": platform.processor(),
+        "python_version": platform.python_version(),
+    }
 
 
 class DatabaseChecker:
@@ -305,10 +361,32 @@ class EmailAlerter:
 class SystemHealthChecker:
     """Monitor and report system health metrics with enhanced features"""
 
-    def __init__(self, config_path="config.json"):
+    # Seconds to wait for disk_usage() before skipping a stalled mount
+    DISK_USAGE_TIMEOUT = 5
+
+    # Most disk_usage() calls allowed in flight at once, stalled ones included
+    DISK_USAGE_MAX_THREADS = 8
+    _disk_query_slots = threading.BoundedSemaphore(DISK_USAGE_MAX_THREADS)
+
+    # Bytes to GB/MB factors; exact, since both are powers of two
+    _INV_GB = 1.0 / (1024**3)
+    _INV_MB = 1.0 / (1024**2)
+
+    # Seconds to sample CPU usage over. None makes get_cpu_info non-blocking:
+    # it reports usage since the previous reading, seeded in __init__
+    CPU_SAMPLE_INTERVAL = 0.2
+
+    def __init__(self, config_path="config.json", cpu_interval=CPU_SAMPLE_INTERVAL):
         self.timestamp = datetime.datetime.now()
-        self.health_data = OrderedDict()
+        self.health_data = {}
+        self.cpu_interval = cpu_interval
+        if cpu_interval is None:
+            psutil.cpu_percent(interval=None, percpu=True)
         self.config = self._load_config(config_path)
+        self.thresholds = {
+            resource_type: self._get_thresholds(resource_type)
+            for resource_type in ("cpu", "memory", "disk")
+        }
         self.db_checker = DatabaseChecker()
         self.email_alerter = EmailAlerter(self.config.get("email", {}))
 
@@ -343,26 +421,22 @@ class SystemHealthChecker:
 
     def get_system_info(self):
         """Gather basic system information"""
-        return {
-            "hostname": platform.node(),
-            "platform": platform.system(),
-            "platform_version": platform.version(),
-            "architecture": platform.machine(),
-            "processor": platform.processor(),
-            "python_version": platform.python_version(),
-        }
+        return dict(_get_platform_info())
 
     def get_cpu_info(self):
         """Get CPU usage and information"""
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
-        total_percent = psutil.cpu_percent(interval=1)
+        # Sample once per core; the total is their mean, so a single
+        # interval serves every field below
+        cpu_percent = psutil.cpu_percent(interval=self.cpu_interval, percpu=True)
+        total_percent = round(sum(cpu_percent) / len(cpu_percent), 1)
+        cpu_freq = psutil.cpu_freq()
 
         return {
             "cpu_count": psutil.cpu_count(logical=False),
             "cpu_count_logical": psutil.cpu_count(logical=True),
             "cpu_percent_total": total_percent,
             "cpu_percent_per_core": cpu_percent,
-            "cpu_freq": psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None,
+            "cpu_freq": cpu_freq._asdict() if cpu_freq else None,
             "status": self._get_status(total_percent, "cpu"),
         }
 
@@ -372,49 +446,89 @@ class SystemHealthChecker:
         swap = psutil.swap_memory()
 
         return {
-            "total_gb": round(memory.total / (1024**3), 2),
-            "available_gb": round(memory.available / (1024**3), 2),
-            "used_gb": round(memory.used / (1024**3), 2),
+            "total_gb": round(memory.total * self._INV_GB, 2),
+            "available_gb": round(memory.available * self._INV_GB, 2),
+            "used_gb": round(memory.used * self._INV_GB, 2),
             "percent_used": memory.percent,
-            "swap_total_gb": round(swap.total / (1024**3), 2),
-            "swap_used_gb": round(swap.used / (1024**3), 2),
+            "swap_total_gb": round(swap.total * self._INV_GB, 2),
+            "swap_used_gb": round(swap.used * self._INV_GB, 2),
             "swap_percent": swap.percent,
             "status": self._get_status(memory.percent, "memory"),
         }
 
     def get_disk_info(self):
         """Get disk usage information"""
-        partitions = psutil.disk_partitions()
+        partitions = psutil.disk_partitions(all=False)
         disk_data = []
 
-        for partition in partitions:
+        if not partitions:
+            return disk_data
+
+        # statvfs() can stall on remote or sleeping mounts, so query the
+        # partitions concurrently and give up on any that miss the deadline.
+        # The queries run in daemon threads: a call stuck on a dead NFS mount
+        # is abandoned and can't keep the process from exiting. Each thread
+        # holds one of a fixed, process-wide set of slots until its call
+        # returns, so stuck calls can't pile up across repeated checks
+        deadline = time.monotonic() + self.DISK_USAGE_TIMEOUT
+        slots = self._disk_query_slots
+        usages = [None] * len(partitions)
+
+        def query(index, mountpoint):
             try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                disk_data.append(
-                    {
-                        "device": partition.device,
-                        "mountpoint": partition.mountpoint,
-                        "fstype": partition.fstype,
-                        "total_gb": round(usage.total / (1024**3), 2),
-                        "used_gb": round(usage.used / (1024**3), 2),
-                        "free_gb": round(usage.free / (1024**3), 2),
-                        "percent_used": usage.percent,
-                        "status": self._get_status(usage.percent, "disk"),
-                    }
-                )
-            except PermissionError:
+                usages[index] = self._get_disk_usage(mountpoint)
+            finally:
+                slots.release()
+
+        threads = []
+        for index, partition in enumerate(partitions):
+            remaining = max(0, deadline - time.monotonic())
+            if not slots.acquire(timeout=remaining):
+                threads.append(None)
                 continue
+            thread = threading.Thread(
+                target=query, args=(index, partition.mountpoint), daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            if thread is not None:
+                thread.join(max(0, deadline - time.monotonic()))
+
+        for partition, thread, usage in zip(partitions, threads, usages):
+            if thread is None or thread.is_alive() or usage is None:
+                continue
+            disk_data.append(
+                {
+                    "device": partition.device,
+                    "mountpoint": partition.mountpoint,
+                    "fstype": partition.fstype,
+                    "total_gb": round(usage.total * self._INV_GB, 2),
+                    "used_gb": round(usage.used * self._INV_GB, 2),
+                    "free_gb": round(usage.free * self._INV_GB, 2),
+                    "percent_used": usage.percent,
+                    "status": self._get_status(usage.percent, "disk"),
+                }
+            )
 
         return disk_data
 
+    def _get_disk_usage(self, mountpoint):
+        """Return disk usage for a mountpoint, or None if it can't be read"""
+        try:
+            return psutil.disk_usage(mountpoint)
+        except OSError:
+            return None
+
     def get_network_info(self):
         """Get network interface information"""
         net_io = psutil.net_io_counters()
         interfaces = psutil.net_if_addrs()
 
         return {
-            "bytes_sent_mb": round(net_io.bytes_sent / (1024**2), 2),
-            "bytes_recv_mb": round(net_io.bytes_recv / (1024**2), 2),
+            "bytes_sent_mb": round(net_io.bytes_sent * self._INV_MB, 2),
+            "bytes_recv_mb": round(net_io.bytes_recv * self._INV_MB, 2),
             "packets_sent": net_io.packets_sent,
             "packets_recv": net_io.packets_recv,
             "errors_in": net_io.errin,
@@ -425,23 +539,31 @@ class SystemHealthChecker:
     def get_process_info(self):
         """Get running process information"""
         process_count = len(psutil.pids())
-        processes = []
+        candidates = []
+
+        # Rank every process on CPU alone, then read the remaining fields
+        # for the top 5 only
+        for proc in psutil.process_iter():
+            try:
+                candidates.append((proc.cpu_percent(), proc))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
 
         # Get top 5 CPU consuming processes
-        for proc in sorted(
-            psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent"]),
-            key=lambda p: p.info["cpu_percent"] or 0,
-            reverse=True,
-        )[:5]:
+        processes = []
+        for cpu_percent, proc in heapq.nlargest(5, candidates, key=lambda c: c[0]):
             try:
-                processes.append(
-                    {
-                        "pid": proc.info["pid"],
-                        "name": proc.info["name"],
-                        "cpu_percent": proc.info["cpu_percent"],
-                        "memory_percent": round(proc.info["memory_percent"], 2),
-                    }
-                )
+                # oneshot() caches /proc/<pid>/stat and friends, so name and
+                # memory come from a single read instead of one syscall each
+                with proc.oneshot():
+                    processes.append(
+                        {
+                            "pid": proc.pid,
+                            "name": proc.name(),
+                            "cpu_percent": cpu_percent,
+                            "memory_percent": round(proc.memory_percent(), 2),
+                        }
+                    )
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
 
@@ -459,11 +581,20 @@ class SystemHealthChecker:
         print("Checking database connectivity...")
         return self.db_checker.check_all(db_configs)
 
+    def _get_thresholds(self, resource_type):
+        """Look up the (warning, critical) thresholds for a resource type"""
+        thresholds = self.config.get("thresholds", {})
+        return (
+            thresholds.get(f"{resource_type}_warning", 60),
+            thresholds.get(f"{resource_type}_critical", 80),
+        )
+
     def _get_status(self, percent, resource_type="cpu"):
         """Determine health status based on percentage and thresholds"""
-        thresholds = self.config.get("thresholds", {})
-        warning = thresholds.get(f"{resource_type}_warning", 60)
-        critical = thresholds.get(f"{resource_type}_critical", 80)
+        thresholds = self.thresholds.get(resource_type)
+        if thresholds is None:
+            thresholds = self._get_thresholds(resource_type)
+        warning, critical = thresholds
 
         if percent < warning:
             return "HEALTHY"
@@ -474,43 +605,61 @@ class SystemHealthChecker:
 
     def get_overall_health(self):
         """Calculate overall system health"""
-        cpu_status = self.health_data["cpu"]["status"]
-        memory_status = self.health_data["memory"]["status"]
-
-        disk_statuses = [disk["status"] for disk in self.health_data["disk"]]
-        worst_disk_status = "HEALTHY"
-
-        if "CRITICAL" in disk_statuses:
-            worst_disk_status = "CRITICAL"
-        elif "WARNING" in disk_statuses:
-            worst_disk_status = "WARNING"
+        critical = _SEVERITY["CRITICAL"]
+        statuses = itertools.chain(
+            (self.health_data["cpu"]["status"], self.health_data["memory"]["status"]),
+            (disk["status"] for disk in self.health_data["disk"]),
+        )
 
-        statuses = [cpu_status, memory_status, worst_disk_status]
+        # Single pass over CPU, memory and disks, stopping at the first
+        # CRITICAL since nothing can make it worse
+        worst = _SEVERITY["HEALTHY"]
+        for status in statuses:
+            worst = max(worst, _SEVERITY[status])
+            if worst == critical:
+                break
 
         # Check databases if enabled
-        if self.health_data.get("databases"):
-            db_statuses = [db["status"] for db in self.health_data["databases"]]
-            if "FAILED" in db_statuses:
-                statuses.append("CRITICAL")
+        if worst < critical and self.health_data.get("databases"):
+            if any(db["status"] == "FAILED" for db in self.health_data["databases"]):
+                worst = critical
 
-        if "CRITICAL" in statuses:
-            return "CRITICAL"
-        elif "WARNING" in statuses:
-            return "WARNING"
-        else:
-            return "HEALTHY"
+        return _STATUS_NAMES[worst]
 
     def collect_all_metrics(self):
         """Collect all system health metrics"""
         print("Collecting system health metrics...\n")
 
         self.health_data["timestamp"] = self.timestamp.isoformat()
-        self.health_data["system"] = self.get_system_info()
-        self.health_data["cpu"] = self.get_cpu_info()
-        self.health_data["memory"] = self.get_memory_info()
-        self.health_data["disk"] = self.get_disk_info()
-        self.health_data["network"] = self.get_network_info()
-        self.health_data["processes"] = self.get_process_info()
+
+        # The collectors are independent and mostly wait on the kernel
+        # (the CPU sample blocks for cpu_interval seconds), so run them side
+        # by side and store the results in a fixed key order
+        collectors = {
+            "system": self.get_system_info,
+            "cpu": self.get_cpu_info,
+            "memory": self.get_memory_info,
+            "disk": self.get_disk_info,
+            "network": self.get_network_info,
+            "processes": self.get_process_info,
+        }
+        # The CPU sample is system-wide, so the disk and process scans (one
+        # thread per mount, a read of every /proc/<pid>) start only once it
+        # has finished, to keep the checker's own work out of the reading
+        deferred = ("disk", "processes")
+
+        with ThreadPoolExecutor(max_workers=len(collectors)) as executor:
+            futures = {
+                key: executor.submit(collector)
+                for key, collector in collectors.items()
+                if key not in deferred
+            }
+            wait([futures["cpu"]])
+            for key in deferred:
+                futures[key] = executor.submit(collectors[key])
+
+            for key in collectors:
+                self.health_data[key] = futures[key].result()
 
         # Check databases if enabled
         db_results = self.check_databases()
@@ -525,75 +674,84 @@ class SystemHealthChecker:
         """Print a formatted health report"""
         data = self.health_data
 
-        print("=" * 80)
-        print(f"SYSTEM HEALTH REPORT - {data['timestamp']}")
-        print("=" * 80)
+        # Build the whole report and emit it with a single write
+        lines = []
+
+        lines.append("=" * 80)
+        lines.append(f"SYSTEM HEALTH REPORT - {data['timestamp']}")
+        lines.append("=" * 80)
 
-        print(f"\nOVERALL HEALTH: {data['overall_health']}")
+        lines.append(f"\nOVERALL HEALTH: {data['overall_health']}")
 
-        print("\n" + "-" * 80)
-        print("SYSTEM INFORMATION")
-        print("-" * 80)
+        lines.append("\n" + "-" * 80)
+        lines.append("SYSTEM INFORMATION")
+        lines.append("-" * 80)
         for key, value in data["system"].items():
-            print(f"  {key.replace('_', ' ').title()}: {value}")
-
-        print("\n" + "-" * 80)
-        print(f"CPU - {data['cpu']['status']}")
-        print("-" * 80)
-        print(f"  Physical Cores: {data['cpu']['cpu_count']}")
-        print(f"  Logical Cores: {data['cpu']['cpu_count_logical']}")
-        print(f"  Total Usage: {data['cpu']['cpu_percent_total']}%")
-
-        print("\n" + "-" * 80)
-        print(f"MEMORY - {data['memory']['status']}")
-        print("-" * 80)
-        print(f"  Total: {data['memory']['total_gb']} GB")
-        print(
+            lines.append(f"  {key.replace('_', ' ').title()}: {value}")
+
+        lines.append("\n" + "-" * 80)
+        lines.append(f"CPU - {data['cpu']['status']}")
+        lines.append("-" * 80)
+        lines.append(f"  Physical Cores: {data['cpu']['cpu_count']}")
+        lines.append(f"  Logical Cores: {data['cpu']['cpu_count_logical']}")
+        lines.append(f"  Total Usage: {data['cpu']['cpu_percent_total']}%")
+
+        lines.append("\n" + "-" * 80)
+        lines.append(f"MEMORY - {data['memory']['status']}")
+        lines.append("-" * 80)
+        lines.append(f"  Total: {data['memory']['total_gb']} GB")
+        lines.append(
             f"  Used: {data['memory']['used_gb']} GB ({data['memory']['percent_used']}%)"
         )
-        print(f"  Available: {data['memory']['available_gb']} GB")
-        print(
+        lines.append(f"  Available: {data['memory']['available_gb']} GB")
+        lines.append(
             f"  Swap Used: {data['memory']['swap_used_gb']} GB ({data['memory']['swap_percent']}%)"
         )
 
-        print("\n" + "-" * 80)
-        print("DISK USAGE")
-        print("-" * 80)
+        lines.append("\n" + "-" * 80)
+        lines.append("DISK USAGE")
+        lines.append("-" * 80)
         for disk in data["disk"]:
-            print(f"  {disk['mountpoint']} ({disk['device']}) - {disk['status']}")
-            print(
+            lines.append(
+                f"  {disk['mountpoint']} ({disk['device']}) - {disk['status']}"
+            )
+            lines.append(
                 f"    Total: {disk['total_gb']} GB | Used: {disk['used_gb']} GB ({disk['percent_used']}%)"
             )
 
-        print("\n" + "-" * 80)
-        print("NETWORK")
-        print("-" * 80)
-        print(f"  Data Sent: {data['network']['bytes_sent_mb']} MB")
-        print(f"  Data Received: {data['network']['bytes_recv_mb']} MB")
-        print(f"  Packets Sent: {data['network']['packets_sent']}")
-        print(f"  Packets Received: {data['network']['packets_recv']}")
-        print(f"  Errors In: {data['network']['errors_in']}")
-        print(f"  Errors Out: {data['network']['errors_out']}")
+        lines.append("\n" + "-" * 80)
+        lines.append("NETWORK")
+        lines.append("-" * 80)
+        lines.append(f"  Data Sent: {data['network']['bytes_sent_mb']} MB")
+        lines.append(f"  Data Received: {data['network']['bytes_recv_mb']} MB")
+        lines.append(f"  Packets Sent: {data['network']['packets_sent']}")
+        lines.append(f"  Packets Received: {data['network']['packets_recv']}")
+        lines.append(f"  Errors In: {data['network']['errors_in']}")
+        lines.append(f"  Errors Out: {data['network']['errors_out']}")
 
         # Print database status if available
         if "databases" in data and data["databases"]:
-            print("\n" + "-" * 80)
-            print("DATABASE CONNECTIVITY")
-            print("-" * 80)
+            lines.append("\n" + "-" * 80)
+            lines.append("DATABASE CONNECTIVITY")
+            lines.append("-" * 80)
             for db in data["databases"]:
                 status_symbol = "✓" if db["status"] == "CONNECTED" else "✗"
-                print(f"  {status_symbol} {db['name']} ({db['type']}) - {db['status']}")
-                print(f"    Host: {db['host']}:{db['port']} | {db['message']}")
+                lines.append(
+                    f"  {status_symbol} {db['name']} ({db['type']}) - {db['status']}"
+                )
+                lines.append(f"    Host: {db['host']}:{db['port']} | {db['message']}")
 
-        print("\n" + "-" * 80)
-        print("TOP CPU CONSUMING PROCESSES")
-        print("-" * 80)
+        lines.append("\n" + "-" * 80)
+        lines.append("TOP CPU CONSUMING PROCESSES")
+        lines.append("-" * 80)
         for proc in data["processes"]["top_cpu_processes"]:
-            print(
+            lines.append(
                 f"  PID: {proc['pid']} | {proc['name']} | CPU: {proc['cpu_percent']}% | MEM: {proc['memory_percent']}%"
             )
 
-        print("\n" + "=" * 80)
+        lines.append("\n" + "=" * 80)
+
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def export_to_json(self, filename=None):
         """Export health data to JSON file"""
@@ -609,8 +767,7 @@ class SystemHealthChecker:
             else:
                 filename = os.path.join(report_path, "system_health_report.json")
 
-        with open(filename, "w") as f:
-            json.dump(self.health_data, f, indent=2)
+        _write_json_atomic(self.health_data, filename)
         print(f"\nHealth report exported to: {filename}")
         return filename
 
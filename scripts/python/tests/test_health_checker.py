@@ -4,6 +4,11 @@ Unit tests for System Health Checker
 
 import pytest
 import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
 from unittest.mock import Mock, patch, MagicMock
 import psutil
 
@@ -13,8 +18,8 @@ class TestSystemHealthChecker:
 
     def test_cpu_check_healthy(self):
         """Test CPU check returns healthy status when below threshold"""
-        # Mock psutil.cpu_percent to return 50%
-        with patch("psutil.cpu_percent", return_value=50.0):
+        # Mock psutil.cpu_percent to return 50% on every core
+        with patch("psutil.cpu_percent", return_value=[50.0, 50.0]):
             from system_health_checker_v2 import SystemHealthChecker
 
             checker = SystemHealthChecker()
@@ -25,7 +30,7 @@ class TestSystemHealthChecker:
 
     def test_cpu_check_warning(self):
         """Test CPU check returns warning when above warning threshold"""
-        with patch("psutil.cpu_percent", return_value=70.0):
+        with patch("psutil.cpu_percent", return_value=[70.0, 70.0]):
             from system_health_checker_v2 import SystemHealthChecker
 
             checker = SystemHealthChecker()
@@ -36,7 +41,7 @@ class TestSystemHealthChecker:
 
     def test_cpu_check_critical(self):
         """Test CPU check returns critical when above critical threshold"""
-        with patch("psutil.cpu_percent", return_value=90.0):
+        with patch("psutil.cpu_percent", return_value=[90.0, 90.0]):
             from system_health_checker_v2 import SystemHealthChecker
 
             checker = SystemHealthChecker()
@@ -45,6 +50,21 @@ class TestSystemHealthChecker:
             assert result["status"] == "CRITICAL"
             assert result["cpu_percent_total"] == 90.0
 
+    def test_cpu_check_non_blocking(self):
+        """Test CPU check without a sample interval seeds and never blocks"""
+        with patch("psutil.cpu_percent", return_value=[20.0, 40.0]) as mock_cpu:
+            from system_health_checker_v2 import SystemHealthChecker
+
+            checker = SystemHealthChecker(cpu_interval=None)
+            mock_cpu.assert_called_once_with(interval=None, percpu=True)
+
+            result = checker.get_cpu_info()
+            assert mock_cpu.call_args_list[-1].kwargs == {
+                "interval": None,
+                "percpu": True,
+            }
+            assert result["cpu_percent_total"] == 30.0
+
     def test_memory_check_healthy(self):
         """Test memory check returns healthy status"""
         mock_memory = MagicMock()
@@ -91,6 +111,209 @@ class TestSystemHealthChecker:
                 assert len(result) > 0
                 assert result[0]["status"] == "HEALTHY"
 
+    def test_disk_check_skips_unreadable_and_stalled_mounts(self):
+        """Test disk check skips mounts that error out or hang"""
+        import threading
+
+        partitions = []
+        for mountpoint in ("/", "/denied", "/nfs"):
+            mock_partition = MagicMock()
+            mock_partition.mountpoint = mountpoint
+            partitions.append(mock_partition)
+
+        mock_usage = MagicMock()
+        mock_usage.percent = 85.0
+        mock_usage.total = 100 * 1024**3
+        mock_usage.used = 85 * 1024**3
+        mock_usage.free = 15 * 1024**3
+
+        release = threading.Event()
+
+        def fake_disk_usage(mountpoint):
+            if mountpoint == "/denied":
+                raise PermissionError(mountpoint)
+            if mountpoint == "/nfs":
+                release.wait(5)
+            return mock_usage
+
+        with patch("psutil.disk_partitions", return_value=partitions):
+            with patch("psutil.disk_usage", side_effect=fake_disk_usage):
+                from system_health_checker_v2 import SystemHealthChecker
+
+                checker = SystemHealthChecker()
+                checker.DISK_USAGE_TIMEOUT = 0.1
+
+                try:
+                    result = checker.get_disk_info()
+                finally:
+                    release.set()
+
+                assert [disk["mountpoint"] for disk in result] == ["/"]
+                assert result[0]["status"] == "CRITICAL"
+
+        # A mount that never answers must not keep the process alive either
+        script = textwrap.dedent(
+            """
+            import time
+            from unittest.mock import MagicMock, patch
+
+            from system_health_checker_v2 import SystemHealthChecker
+
+            partition = MagicMock()
+            partition.mountpoint = "/nfs"
+
+            with patch("psutil.disk_partitions", return_value=[partition]):
+                with patch("psutil.disk_usage", side_effect=lambda m: time.sleep(30)):
+                    checker = SystemHealthChecker()
+                    checker.DISK_USAGE_TIMEOUT = 0.2
+                    assert checker.get_disk_info() == []
+            """
+        )
+        started = time.monotonic()
+        completed = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            timeout=20,
+        )
+        assert completed.returncode == 0, completed.stderr
+        assert time.monotonic() - started < 10
+
+    def test_disk_check_caps_stalled_threads(self):
+        """Test stalled disk queries can't pile up across repeated checks"""
+        import threading
+
+        from system_health_checker_v2 import SystemHealthChecker
+
+        partitions = []
+        for mountpoint in ("/nfs1", "/nfs2", "/nfs3"):
+            mock_partition = MagicMock()
+            mock_partition.mountpoint = mountpoint
+            partitions.append(mock_partition)
+
+        release = threading.Event()
+        started = []
+
+        def fake_disk_usage(mountpoint):
+            started.append(mountpoint)
+            release.wait(5)
+
+        slots = threading.BoundedSemaphore(2)
+        with patch.object(SystemHealthChecker, "_disk_query_slots", slots):
+            with patch("psutil.disk_partitions", return_value=partitions):
+                with patch("psutil.disk_usage", side_effect=fake_disk_usage):
+                    checker = SystemHealthChecker()
+                    checker.DISK_USAGE_TIMEOUT = 0.1
+
+                    try:
+                        assert checker.get_disk_info() == []
+                        assert checker.get_disk_info() == []
+                        assert started == ["/nfs1", "/nfs2"]
+                    finally:
+                        release.set()
+
+    def test_status_uses_configured_thresholds(self, tmp_path):
+        """Test status classification honours per-resource thresholds"""
+        config_file = tmp_path / "config.json"
+        config_file.write_text(
+            json.dumps({"thresholds": {"disk_warning": 90, "disk_critical": 95}})
+        )
+
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker(config_path=str(config_file))
+
+        assert checker._get_status(85.0, "disk") == "HEALTHY"
+        assert checker._get_status(92.0, "disk") == "WARNING"
+        assert checker._get_status(85.0, "cpu") == "CRITICAL"
+
+    def test_process_info_top_five(self):
+        """Test process info keeps only the top 5 CPU consumers"""
+        mock_processes = []
+        for i in range(8):
+            mock_proc = MagicMock()
+            mock_proc.pid = 100 + i
+            mock_proc.name.return_value = f"proc{i}"
+            mock_proc.cpu_percent.return_value = float(i)
+            mock_proc.memory_percent.return_value = 1.234
+            mock_processes.append(mock_proc)
+
+        vanished = MagicMock()
+        vanished.cpu_percent.side_effect = psutil.NoSuchProcess(999)
+        mock_processes.append(vanished)
+
+        with patch("psutil.pids", return_value=list(range(9))):
+            with patch("psutil.process_iter", return_value=mock_processes):
+                from system_health_checker_v2 import SystemHealthChecker
+
+                checker = SystemHealthChecker()
+
+                result = checker.get_process_info()
+                assert result["total_processes"] == 9
+                top = result["top_cpu_processes"]
+                assert [p["pid"] for p in top] == [107, 106, 105, 104, 103]
+                assert top[0]["memory_percent"] == 1.23
+                mock_processes[0].name.assert_not_called()
+                mock_processes[0].memory_percent.assert_not_called()
+
+    def test_collect_all_metrics_key_order(self):
+        """Test concurrent collection keeps the report keys in order"""
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+        checker.get_system_info = Mock(return_value={"hostname": "test"})
+        checker.get_cpu_info = Mock(return_value={"status": "HEALTHY"})
+        checker.get_memory_info = Mock(return_value={"status": "WARNING"})
+        checker.get_disk_info = Mock(return_value=[{"status": "HEALTHY"}])
+        checker.get_network_info = Mock(return_value={})
+        checker.get_process_info = Mock(return_value={})
+
+        result = checker.collect_all_metrics()
+        assert list(result) == [
+            "timestamp",
+            "system",
+            "cpu",
+            "memory",
+            "disk",
+            "network",
+            "processes",
+            "overall_health",
+        ]
+        assert result["overall_health"] == "WARNING"
+
+    def test_collect_all_metrics_scans_after_cpu_sample(self):
+        """Test disk and process scans don't overlap the CPU sample"""
+        import threading
+
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+        cpu_done = threading.Event()
+        overlapped = []
+
+        def fake_cpu_info():
+            time.sleep(0.1)
+            cpu_done.set()
+            return {"status": "HEALTHY"}
+
+        def scan(result):
+            def collector():
+                overlapped.append(not cpu_done.is_set())
+                return result
+
+            return collector
+
+        checker.get_system_info = Mock(return_value={})
+        checker.get_cpu_info = fake_cpu_info
+        checker.get_memory_info = Mock(return_value={"status": "HEALTHY"})
+        checker.get_disk_info = scan([{"status": "HEALTHY"}])
+        checker.get_network_info = Mock(return_value={})
+        checker.get_process_info = scan({})
+
+        checker.collect_all_metrics()
+        assert overlapped == [False, False]
+
     def test_overall_health_healthy(self):
         """Test overall health calculation when all systems healthy"""
         from system_health_checker_v2 import SystemHealthChecker
@@ -136,6 +359,38 @@ class TestSystemHealthChecker:
         result = checker.get_overall_health()
         assert result == "CRITICAL"
 
+    def test_overall_health_uses_worst_disk(self):
+        """Test overall health picks up the worst disk status"""
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+
+        checker.health_data = {
+            "cpu": {"status": "HEALTHY"},
+            "memory": {"status": "WARNING"},
+            "disk": [{"status": "HEALTHY"}, {"status": "CRITICAL"}],
+        }
+        assert checker.get_overall_health() == "CRITICAL"
+
+        checker.health_data["disk"] = []
+        assert checker.get_overall_health() == "WARNING"
+
+    def test_overall_health_failed_database(self):
+        """Test a failed database connection makes overall health critical"""
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+
+        checker.health_data = {
+            "cpu": {"status": "HEALTHY"},
+            "memory": {"status": "HEALTHY"},
+            "disk": [{"status": "WARNING"}],
+            "databases": [{"status": "CONNECTED"}, {"status": "FAILED"}],
+        }
+
+        result = checker.get_overall_health()
+        assert result == "CRITICAL"
+
 
 class TestDatabaseChecker:
     """Test DatabaseChecker class"""
@@ -237,6 +492,111 @@ class TestReportGeneration:
             data = json.load(f)
             assert data["overall_health"] == "HEALTHY"
 
+    def test_export_json_report_without_orjson(self, tmp_path):
+        """Test JSON report export falls back to stdlib json"""
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+        checker.health_data = {
+            "timestamp": "2024-01-01T00:00:00",
+            "overall_health": "WARNING",
+        }
+
+        report_file = tmp_path / "report.json"
+        with patch("system_health_checker_v2.orjson", None):
+            checker.export_to_json(str(report_file))
+
+        with open(report_file, "r") as f:
+            assert json.load(f)["overall_health"] == "WARNING"
+        assert [p.name for p in tmp_path.iterdir()] == ["report.json"]
+
+    def test_export_json_report_with_orjson(self, tmp_path):
+        """Test JSON report export through orjson matches stdlib output"""
+        orjson = pytest.importorskip("orjson")
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+        checker.health_data = {
+            "timestamp": "2024-01-01T00:00:00",
+            "overall_health": "HEALTHY",
+            "disk": [{"mountpoint": "/", "percent_used": 40.5}],
+        }
+
+        report_file = tmp_path / "report.json"
+        with patch.object(orjson, "dumps", wraps=orjson.dumps) as mock_dumps:
+            checker.export_to_json(str(report_file))
+            mock_dumps.assert_called_once()
+
+        assert report_file.read_text() == json.dumps(checker.health_data, indent=2)
+        assert [p.name for p in tmp_path.iterdir()] == ["report.json"]
+
+    def test_export_json_report_cleans_up_on_failure(self, tmp_path):
+        """Test a failed export leaves neither a report nor a temp file"""
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+        checker.health_data = {"overall_health": "HEALTHY"}
+
+        with patch("os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                checker.export_to_json(str(tmp_path / "report.json"))
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_print_report(self, capsys):
+        """Test the console report is written in one piece"""
+        from system_health_checker_v2 import SystemHealthChecker
+
+        checker = SystemHealthChecker()
+        checker.health_data = {
+            "timestamp": "2024-01-01T00:00:00",
+            "overall_health": "WARNING",
+            "system": {"hostname": "test"},
+            "cpu": {
+                "status": "HEALTHY",
+                "cpu_count": 2,
+                "cpu_count_logical": 4,
+                "cpu_percent_total": 12.5,
+            },
+            "memory": {
+                "status": "WARNING",
+                "total_gb": 8.0,
+                "used_gb": 5.6,
+                "percent_used": 70.0,
+                "available_gb": 2.4,
+                "swap_used_gb": 0.0,
+                "swap_percent": 0.0,
+            },
+            "disk": [
+                {
+                    "mountpoint": "/",
+                    "device": "/dev/sda1",
+                    "status": "HEALTHY",
+                    "total_gb": 100.0,
+                    "used_gb": 40.0,
+                    "percent_used": 40.0,
+                }
+            ],
+            "network": {
+                "bytes_sent_mb": 1.0,
+                "bytes_recv_mb": 2.0,
+                "packets_sent": 10,
+                "packets_recv": 20,
+                "errors_in": 0,
+                "errors_out": 0,
+            },
+            "processes": {"top_cpu_processes": []},
+        }
+
+        capsys.readouterr()
+        checker.print_report()
+
+        output = capsys.readouterr().out
+        assert output.startswith("=" * 80 + "\nSYSTEM HEALTH REPORT")
+        assert "OVERALL HEALTH: WARNING" in output
+        assert "  / (/dev/sda1) - HEALTHY" in output
+        assert output.endswith("\n" + "=" * 80 + "\n")
+
 
 class TestCommandLineArguments:
     """Test command-line argument parsing"""
@@ -4,11 +4,20 @@ Vault Integration Demo Application
 Demonstrates how to use HashiCorp Vault for secrets management
 """
 
+import base64
 import os
 import time
 import hvac
+import requests
 import sys
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
+from functools import partial
+from hvac.exceptions import VaultError
+
+# Fixed-width mask for printed secrets, so output never hints at length
+MASK = "********"
 
 
 def print_section(title):
@@ -18,6 +27,16 @@ def print_section(title):
     print(f"{'='*60}\n")
 
 
+def get_demo_pace():
+    """Read DEMO_PACE (seconds between demos), defaulting to no pause"""
+    value = os.getenv('DEMO_PACE', '0')
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        print(f"Ignoring invalid DEMO_PACE={value!r}; expected seconds")
+        return 0.0
+
+
 def connect_to_vault():
     """Connect to Vault server"""
     vault_addr = os.getenv('VAULT_ADDR', 'http://vault:8200')
@@ -26,7 +45,17 @@ def connect_to_vault():
     print_section("Connecting to Vault")
     print(f"Vault Address: {vault_addr}")
 
-    client = hvac.Client(url=vault_addr, token=vault_token)
+    # Share one keep-alive connection pool across every demo call and
+    # retry idempotent requests that hit a transient failure
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        max_retries=Retry(total=3, backoff_factor=0.2)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    client = hvac.Client(url=vault_addr, token=vault_token, session=session)
 
     if client.is_authenticated():
         print("✓ Successfully authenticated with Vault")
@@ -36,20 +65,44 @@ def connect_to_vault():
         sys.exit(1)
 
 
-def demo_static_secrets(client):
+def list_secrets_engines(client):
+    """Return the mount paths of all enabled secrets engines"""
+    try:
+        return set(client.sys.list_mounted_secrets_engines()['data'])
+    except VaultError as e:
+        # Fall back to trying every enable; each demo reports its own error
+        print(f"✗ Could not list secrets engines: {e}")
+        return set()
+
+
+def enable_secrets_engine(client, mounted, backend_type, path, **kwargs):
+    """Enable a secrets engine unless one is already mounted at path"""
+    if f"{path}/" in mounted:
+        return False
+
+    client.sys.enable_secrets_engine(
+        backend_type=backend_type,
+        path=path,
+        **kwargs
+    )
+    mounted.add(f"{path}/")
+    return True
+
+
+def demo_static_secrets(client, mounted):
     """Demonstrate static secrets (KV v2)"""
     print_section("Demo 1: Static Secrets (Key-Value Store)")
 
     # Enable KV v2 secrets engine
     try:
-        client.sys.enable_secrets_engine(
-            backend_type='kv',
-            path='secret',
-            options={'version': '2'}
-        )
-        print("✓ Enabled KV v2 secrets engine at 'secret/'")
-    except Exception as e:
-        print(f"KV engine already enabled: {e}")
+        if enable_secrets_engine(client, mounted, 'kv', 'secret',
+                                 options={'version': '2'}):
+            print("✓ Enabled KV v2 secrets engine at 'secret/'")
+        else:
+            print("KV engine already enabled at 'secret/'")
+    except VaultError as e:
+        print(f"✗ Could not enable KV engine: {e}")
+        return
 
     # Write a secret
     secret_data = {
@@ -71,27 +124,27 @@ def demo_static_secrets(client):
         path='app/config'
     )
     print("\n✓ Read secret from Vault:")
-    for key, value in secret['data']['data'].items():
-        print(f"  {key}: {'*' * len(str(value))}")
+    for key in secret['data']['data']:
+        print(f"  {key}: {MASK}")
 
     # List secrets
     secrets_list = client.secrets.kv.v2.list_secrets(path='app')
     print(f"\n✓ Secrets under 'secret/app/': {secrets_list['data']['keys']}")
 
 
-def demo_dynamic_secrets(client):
+def demo_dynamic_secrets(client, mounted):
     """Demonstrate dynamic database secrets"""
     print_section("Demo 2: Dynamic Database Secrets")
 
     # Enable database secrets engine
     try:
-        client.sys.enable_secrets_engine(
-            backend_type='database',
-            path='database'
-        )
-        print("✓ Enabled database secrets engine")
-    except Exception as e:
-        print(f"Database engine already enabled: {e}")
+        if enable_secrets_engine(client, mounted, 'database', 'database'):
+            print("✓ Enabled database secrets engine")
+        else:
+            print("Database engine already enabled")
+    except VaultError as e:
+        print(f"✗ Could not enable database engine: {e}")
+        return
 
     # Configure PostgreSQL connection
     try:
@@ -136,19 +189,19 @@ def demo_dynamic_secrets(client):
         print(f"Error generating credentials: {e}")
 
 
-def demo_encryption_as_service(client):
+def demo_encryption_as_service(client, mounted):
     """Demonstrate encryption as a service (Transit)"""
     print_section("Demo 3: Encryption as a Service (Transit)")
 
     # Enable transit secrets engine
     try:
-        client.sys.enable_secrets_engine(
-            backend_type='transit',
-            path='transit'
-        )
-        print("✓ Enabled transit secrets engine")
-    except Exception as e:
-        print(f"Transit engine already enabled: {e}")
+        if enable_secrets_engine(client, mounted, 'transit', 'transit'):
+            print("✓ Enabled transit secrets engine")
+        else:
+            print("Transit engine already enabled")
+    except VaultError as e:
+        print(f"✗ Could not enable transit engine: {e}")
+        return
 
     # Create encryption key
     try:
@@ -159,8 +212,9 @@ def demo_encryption_as_service(client):
 
     # Encrypt data
     plaintext = "Sensitive customer information: SSN 123-45-6789"
-    import base64
-    plaintext_b64 = base64.b64encode(plaintext.encode()).decode()
+    # Transit takes base64 text; the request body is JSON, so it must be a
+    # str rather than the raw bytes from b64encode
+    plaintext_b64 = base64.b64encode(plaintext.encode()).decode('ascii')
 
     encrypted = client.secrets.transit.encrypt_data(
         name='customer-data',
@@ -220,14 +274,18 @@ def demo_audit_logging(client):
 
     # Enable file audit device
     try:
+        if 'file/' in client.sys.list_enabled_audit_devices()['data']:
+            print("Audit device already enabled at 'file/'")
+            return
+
         client.sys.enable_audit_device(
             device_type='file',
             options={'file_path': '/vault/logs/audit.log'}
         )
         print("✓ Enabled audit logging to /vault/logs/audit.log")
         print("  All Vault operations are now logged for security auditing")
-    except Exception as e:
-        print(f"Audit device already enabled: {e}")
+    except VaultError as e:
+        print(f"✗ Could not enable audit logging: {e}")
 
 
 def demo_kubernetes_auth(client):
@@ -257,27 +315,34 @@ def main():
     print("="*60)
     print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
+    # Run demonstrations back to back; set DEMO_PACE (seconds) to pause
+    # between them when following along in the logs
+    pace = get_demo_pace()
+
     # Connect to Vault
     client = connect_to_vault()
 
-    # Run demonstrations
     try:
-        demo_static_secrets(client)
-        time.sleep(2)
-
-        demo_dynamic_secrets(client)
-        time.sleep(2)
-
-        demo_encryption_as_service(client)
-        time.sleep(2)
-
-        demo_policies(client)
-        time.sleep(2)
-
-        demo_audit_logging(client)
-        time.sleep(2)
-
-        demo_kubernetes_auth(client)
+        # Look up mounted engines once so demos only enable what's missing
+        mounted = list_secrets_engines(client)
+
+        demos = [
+            partial(demo_static_secrets, client, mounted),
+            partial(demo_dynamic_secrets, client, mounted),
+            partial(demo_encryption_as_service, client, mounted),
+            partial(demo_policies, client),
+            partial(demo_audit_logging, client),
+            partial(demo_kubernetes_auth, client),
+        ]
+
+        # A Vault error ends only the demo that hit it; the rest still run
+        for index, demo in enumerate(demos):
+            if pace and index:
+                time.sleep(pace)
+            try:
+                demo()
+            except VaultError as e:
+                print(f"\n✗ Vault error during demo: {e}")
 
     except Exception as e:
         print(f"\n✗ Error during demo: {e}")